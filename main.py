@@ -5,7 +5,12 @@ Système de mémoire collective avec isolation par équipe
 
 import os
 import hashlib
+import heapq
 import json
+import re
+import time
+import uuid
+from collections import Counter
 from datetime import datetime
 from typing import List, Dict, Optional
 
@@ -34,12 +39,14 @@ def ensure_urllib():
             import urllib.request
             import urllib.parse
             import urllib.error
-            import json as json_module
+            import ssl
             urllib = {
                 'request': urllib.request,
                 'parse': urllib.parse,
                 'error': urllib.error,
-                'json': json_module
+                'json': json,
+                # Contexte TLS partagé: certificats CA chargés une seule fois
+                'ssl_context': ssl.create_default_context()
             }
             if not IS_LAMBDA:
                 print("✅ Module urllib disponible comme fallback")
@@ -48,11 +55,17 @@ def ensure_urllib():
             if not IS_LAMBDA:
                 print("❌ Module urllib non disponible")
 
-QDRANT_AVAILABLE = False
-QdrantClient = None
-Distance = None
-VectorParams = None
-PointStruct = None
+# Session HTTP partagée (keep-alive) pour éviter un handshake TLS par appel
+http_session = None
+
+def get_http_session():
+    """Obtenir la session requests partagée avec initialisation paresseuse"""
+    global http_session
+    if http_session is None:
+        ensure_requests()
+        if requests is not None:
+            http_session = requests.Session()
+    return http_session
 
 # Charger les variables d'environnement depuis config.env.example si .env n'existe pas
 if not os.path.exists('.env') and os.path.exists('config.env.example'):
@@ -72,6 +85,8 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 QDRANT_ENABLED = os.getenv("QDRANT_ENABLED", "false").lower() == "true"
+# Transport gRPC (HTTP/2 persistant, protobuf) au lieu de REST/JSON - opt-in
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
 
 # Détection environnement Lambda
 IS_LAMBDA = (
@@ -204,11 +219,15 @@ def extract_token_from_headers():
                 return auth_header[7:]  # Enlever "Bearer "
         
         # 2. Debug: afficher tous les headers disponibles dans l'environnement
-        print("=== DEBUG HEADERS ENV ===")
-        for key, value in os.environ.items():
-            if "AUTH" in key.upper() or "HEADER" in key.upper() or "HTTP" in key.upper():
-                print(f"{key}: {value}")
-        print("========================")
+        # (un seul print groupé, uniquement en local)
+        if not IS_LAMBDA:
+            debug_lines = ["=== DEBUG HEADERS ENV ==="]
+            for key, value in os.environ.items():
+                key_upper = key.upper()
+                if "AUTH" in key_upper or "HEADER" in key_upper or "HTTP" in key_upper:
+                    debug_lines.append(f"{key}: {value}")
+            debug_lines.append("========================")
+            print("\n".join(debug_lines))
         
         # 3. En Lambda, les headers sont disponibles via les variables d'environnement
         auth_header = os.getenv("HTTP_AUTHORIZATION", "")
@@ -230,17 +249,23 @@ def extract_token_from_headers():
 
 # Modèle de données enrichi pour le cerveau collectif
 class Memory:
+    # Pas de __dict__ par instance: le stockage fallback peut en contenir beaucoup
+    __slots__ = ("content", "user_id", "team_id", "timestamp", "tags",
+                 "category", "visibility", "confidence", "words")
+    
     def __init__(self, content: str, user_id: str = "", team_id: str = "", 
-                 timestamp: str = "", tags: List[str] = [], category: str = "general",
+                 timestamp: str = "", tags: Optional[List[str]] = None, category: str = "general",
                  visibility: str = "team", confidence: float = 0.5):
         self.content = content
         self.user_id = user_id
         self.team_id = team_id
         self.timestamp = timestamp
-        self.tags = tags
+        self.tags = tags if tags is not None else []
         self.category = category
         self.visibility = visibility
         self.confidence = confidence
+        # Mots normalisés précalculés pour la recherche en mémoire
+        self.words = tokenize_words(content)
 
 # Stockage en mémoire simple (fallback)
 memories: Dict[str, Memory] = {}
@@ -269,22 +294,31 @@ def ensure_qdrant_import():
             if not IS_LAMBDA:
                 print("❌ Qdrant non disponible")
 
+def tokenize_words(text: str) -> set:
+    """Ensemble des mots normalisés (minuscules) d'un texte"""
+    return set(text.lower().split())
+
+def word_similarity(words1: set, words2: set) -> float:
+    """Similarité de Jaccard entre deux ensembles de mots déjà normalisés"""
+    intersection = len(words1 & words2)
+    union = len(words1 | words2)
+    return intersection / union if union > 0 else 0.0
+
 def calculate_similarity(text1: str, text2: str) -> float:
     """Calcule la similarité entre deux textes"""
-    words1 = set(text1.lower().split())
-    words2 = set(text2.lower().split())
-    intersection = len(words1.intersection(words2))
-    union = len(words1.union(words2))
-    return intersection / union if union > 0 else 0.0
+    return word_similarity(tokenize_words(text1), tokenize_words(text2))
 
 def generate_embedding(text: str) -> List[float]:
     """Génère un embedding simple basé sur le hash du texte"""
-    hash_obj = hashlib.md5(text.encode())
-    hash_bytes = hash_obj.digest()
-    vector = []
-    for i in range(384):  # Dimension standard
-        vector.append((hash_bytes[i % 16] - 128) / 128.0)
-    return vector
+    hash_bytes = hashlib.md5(text.encode()).digest()
+    # Le vecteur (dimension standard 384) répète les 16 octets du hash:
+    # on normalise 16 valeurs puis on duplique la liste en une seule opération
+    block = [(byte - 128) / 128.0 for byte in hash_bytes]
+    return block * (384 // len(block))
+
+# Cache des tokens vérifiés: token -> (expiration monotonic, infos utilisateur)
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+verified_tokens: Dict[str, tuple] = {}
 
 def verify_user_token(user_token: str) -> Optional[Dict]:
     """Vérifier un token utilisateur via Supabase (obligatoire)"""
@@ -303,15 +337,23 @@ def verify_user_token(user_token: str) -> Optional[Dict]:
             if not IS_LAMBDA:
                 print(f"🔍 Token nettoyé: {user_token[:10]}...")
         
+        # Réutiliser une vérification récente pour éviter un aller-retour Supabase
+        cached = verified_tokens.get(user_token)
+        if cached is not None:
+            expires_at, cached_info = cached
+            if time.monotonic() < expires_at:
+                return cached_info
+            del verified_tokens[user_token]
+        
         if not IS_LAMBDA:
             print(f"🔍 Appel Supabase: {SUPABASE_URL}/rest/v1/rpc/verify_user_token")
         
-        # Utiliser requests si disponible, sinon urllib
-        ensure_requests()
-        if requests is not None:
+        # Utiliser requests si disponible (session keep-alive), sinon urllib
+        session = get_http_session()
+        if session is not None:
             if not IS_LAMBDA:
                 print("🔍 Utilisation de requests")
-            response = requests.post(
+            response = session.post(
                 f"{SUPABASE_URL}/rest/v1/rpc/verify_user_token",
                 headers={
                     "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
@@ -339,7 +381,7 @@ def verify_user_token(user_token: str) -> Optional[Dict]:
                         "apikey": SUPABASE_SERVICE_KEY
                     }
                 )
-                response = urllib['request'].urlopen(req, timeout=3)
+                response = urllib['request'].urlopen(req, timeout=3, context=urllib['ssl_context'])
                 status_code = response.getcode()
                 response_text = response.read().decode('utf-8')
             else:
@@ -358,6 +400,8 @@ def verify_user_token(user_token: str) -> Optional[Dict]:
             if data and len(data) > 0:
                 if not IS_LAMBDA:
                     print(f"✅ Token valide pour utilisateur: {data[0]}")
+                if TOKEN_CACHE_TTL > 0:
+                    verified_tokens[user_token] = (time.monotonic() + TOKEN_CACHE_TTL, data[0])
                 return data[0]
         
         if not IS_LAMBDA:
@@ -375,6 +419,8 @@ class QdrantStorage:
         self.client = None
         self._initialized = False
         self._init_attempted = False
+        # Collections dont l'existence est confirmée (évite un get_collections par appel)
+        self._known_collections = set()
     
     def _ensure_connected(self):
         """Connexion paresseuse avec timeout court"""
@@ -399,6 +445,7 @@ class QdrantStorage:
                 self.client = QdrantClient(
                     url=QDRANT_URL,
                     api_key=QDRANT_API_KEY,
+                    prefer_grpc=QDRANT_PREFER_GRPC,
                     timeout=3  # Timeout court pour Lambda
                 )
                 self._initialized = True
@@ -418,22 +465,27 @@ class QdrantStorage:
         clean_team_id = team_id.replace("-", "_").replace(" ", "_")
         return f"team_memories_{clean_team_id}"
     
+    def _collection_exists(self, collection_name: str) -> bool:
+        """Vérifier l'existence d'une collection (cache des collections connues)"""
+        if collection_name in self._known_collections:
+            return True
+        
+        collections = self.client.get_collections()
+        self._known_collections.update(c.name for c in collections.collections)
+        return collection_name in self._known_collections
+    
     def _ensure_collection_exists(self, team_id: str):
         """S'assurer que la collection de l'équipe existe (paresseux)"""
         collection_name = self._get_collection_name(team_id)
         
         try:
-            collections = self.client.get_collections()
-            collection_names = [c.name for c in collections.collections]
-            
-            if collection_name not in collection_names:
+            if not self._collection_exists(collection_name):
                 self.client.create_collection(
                     collection_name=collection_name,
                     vectors_config=VectorParams(size=384, distance=Distance.COSINE)
                 )
+                self._known_collections.add(collection_name)
                 print(f"✅ Collection '{collection_name}' créée pour l'équipe {team_id}")
-            else:
-                print(f"✅ Collection '{collection_name}' existe pour l'équipe {team_id}")
                 
         except Exception as e:
             print(f"❌ Erreur collection: {e}")
@@ -471,6 +523,8 @@ class QdrantStorage:
             
         except Exception as e:
             print(f"❌ Erreur stockage: {e}")
+            # Revalider la collection au prochain appel (suppression externe possible)
+            self._known_collections.discard(self._get_collection_name(team_id))
             raise
     
     def search_memories(self, query: str, team_id: str, limit: int = 5) -> List[Dict]:
@@ -480,10 +534,7 @@ class QdrantStorage:
             collection_name = self._get_collection_name(team_id)
             
             # Vérifier que la collection existe
-            collections = self.client.get_collections()
-            collection_names = [c.name for c in collections.collections]
-            
-            if collection_name not in collection_names:
+            if not self._collection_exists(collection_name):
                 print(f"⚠️ Collection {collection_name} n'existe pas encore")
                 return []
             
@@ -536,10 +587,7 @@ class QdrantStorage:
             collection_name = self._get_collection_name(team_id)
             
             # Vérifier que la collection existe
-            collections = self.client.get_collections()
-            collection_names = [c.name for c in collections.collections]
-            
-            if collection_name not in collection_names:
+            if not self._collection_exists(collection_name):
                 return []
             
             points = self.client.scroll(
@@ -597,6 +645,16 @@ def get_mcp_instance():
         mcp = get_mcp()
     return mcp
 
+# Mots-clés de détection automatique, compilés une seule fois (un seul scan par motif)
+HIGH_CONFIDENCE_RE = re.compile(r"décision|important|critique|urgent|bug|erreur", re.IGNORECASE)
+MEDIUM_CONFIDENCE_RE = re.compile(r"solution|résolu|fix|correction", re.IGNORECASE)
+CATEGORY_PATTERNS = [
+    ("bug", re.compile(r"bug|erreur|problème|issue", re.IGNORECASE)),
+    ("decision", re.compile(r"décision|choix|stratégie", re.IGNORECASE)),
+    ("feature", re.compile(r"feature|fonctionnalité|nouveau", re.IGNORECASE)),
+    ("meeting", re.compile(r"réunion|meeting|call", re.IGNORECASE)),
+]
+
 # Outils MCP avec authentification via OAuth2PasswordBearer
 def add_memory(
     content: str,
@@ -646,29 +704,25 @@ def add_memory(
     team_id = user_info["team_id"]
     user_name = user_info["user_name"]
     
-    # Générer un ID unique
-    memory_id = hashlib.md5(f"{content}{datetime.now().isoformat()}{user_id}".encode()).hexdigest()
+    # Générer un ID unique (UUID aléatoire, format accepté comme ID de point Qdrant)
+    memory_id = uuid.uuid4().hex
     
     # Parser les tags
     tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else []
     
     # Détection automatique de l'importance
     confidence = 0.5
-    if any(word in content.lower() for word in ["décision", "important", "critique", "urgent", "bug", "erreur"]):
+    if HIGH_CONFIDENCE_RE.search(content):
         confidence = 0.8
-    elif any(word in content.lower() for word in ["solution", "résolu", "fix", "correction"]):
+    elif MEDIUM_CONFIDENCE_RE.search(content):
         confidence = 0.7
     
     # Détection automatique de catégorie
     if category == "general":
-        if any(word in content.lower() for word in ["bug", "erreur", "problème", "issue"]):
-            category = "bug"
-        elif any(word in content.lower() for word in ["décision", "choix", "stratégie"]):
-            category = "decision"
-        elif any(word in content.lower() for word in ["feature", "fonctionnalité", "nouveau"]):
-            category = "feature"
-        elif any(word in content.lower() for word in ["réunion", "meeting", "call"]):
-            category = "meeting"
+        for detected_category, pattern in CATEGORY_PATTERNS:
+            if pattern.search(content):
+                category = detected_category
+                break
     
     # Créer la mémoire enrichie
     memory = Memory(
@@ -740,6 +794,17 @@ def search_memories(
     team_id = user_info["team_id"]
     user_name = user_info["user_name"]
     
+    # Chemin rapide: requête vide ou limite nulle, inutile d'interroger le stockage
+    if not query.strip() or limit <= 0:
+        return json.dumps({
+            "status": "success",
+            "query": query,
+            "results": [],
+            "total_found": 0,
+            "user": user_name,
+            "team": team_id
+        })
+    
     storage = get_storage()
     if storage:
         try:
@@ -752,15 +817,17 @@ def search_memories(
     
     # Si pas de résultats de Qdrant, utiliser le stockage en mémoire
     if not results:
+        query_words = tokenize_words(query)
         scored_memories = []
         for memory_id, memory in memories.items():
             if memory.team_id == team_id:  # Isolation par équipe
-                similarity = calculate_similarity(query, memory.content)
+                similarity = word_similarity(query_words, memory.words)
                 scored_memories.append((similarity, memory_id, memory))
         
-        scored_memories.sort(key=lambda x: x[0], reverse=True)
+        # Sélection top-K en O(n log k) plutôt qu'un tri complet
+        top_memories = heapq.nlargest(limit, scored_memories, key=lambda x: x[0])
         
-        for similarity, memory_id, memory in scored_memories[:limit]:
+        for similarity, memory_id, memory in top_memories:
             if similarity > 0:
                 results.append({
                     "memory_id": memory_id,
@@ -854,6 +921,34 @@ def search_memories(
 #         "message": f"Mémoire {memory_id} supprimée du cerveau collectif (mémoire)"
 #     })
 
+def collect_team_memories(team_id: str) -> List[Dict]:
+    """Récupérer les mémoires d'une équipe sous forme de dicts (Qdrant puis fallback mémoire)"""
+    all_memories = []
+    storage = get_storage()
+    
+    if storage:
+        try:
+            all_memories = storage.list_memories(team_id)
+        except Exception as e:
+            print(f"⚠️ Erreur Qdrant, fallback vers mémoire: {e}")
+            all_memories = []
+    
+    # Si pas de résultats de Qdrant, utiliser le stockage en mémoire
+    if not all_memories:
+        for memory_id, memory in memories.items():
+            if memory.team_id == team_id:  # Isolation par équipe
+                all_memories.append({
+                    "memory_id": memory_id,
+                    "content": memory.content,
+                    "tags": memory.tags,
+                    "timestamp": memory.timestamp,
+                    "user_id": memory.user_id,
+                    "category": memory.category,
+                    "confidence": memory.confidence
+                })
+    
+    return all_memories
+
 def list_memories(token: str = None) -> str:
     """Lister toutes les mémoires du cerveau collectif avec authentification"""
     
@@ -886,39 +981,17 @@ def list_memories(token: str = None) -> str:
     team_id = user_info["team_id"]
     user_name = user_info["user_name"]
     
-    storage = get_storage()
-    if storage:
-        try:
-            all_memories = storage.list_memories(team_id)
-        except Exception as e:
-            print(f"⚠️ Erreur Qdrant, fallback vers mémoire: {e}")
-            all_memories = []
-    else:
-        all_memories = []
+    all_memories = collect_team_memories(team_id)
     
-    # Si pas de résultats de Qdrant, utiliser le stockage en mémoire
     if not all_memories:
-        if not memories:
-            return json.dumps({
-                "status": "success",
-                "message": "Aucune mémoire dans le cerveau collectif",
-                "total": 0,
-                "memories": [],
-                "user": user_name,
-                "team": team_id
-            })
-        
-        for memory_id, memory in memories.items():
-            if memory.team_id == team_id:  # Isolation par équipe
-                all_memories.append({
-                    "memory_id": memory_id,
-                    "content": memory.content,
-                    "tags": memory.tags,
-                    "timestamp": memory.timestamp,
-                    "user_id": memory.user_id,
-                    "category": memory.category,
-                    "confidence": memory.confidence
-                })
+        return json.dumps({
+            "status": "success",
+            "message": "Aucune mémoire dans le cerveau collectif",
+            "total": 0,
+            "memories": [],
+            "user": user_name,
+            "team": team_id
+        })
     
     return json.dumps({
         "status": "success",
@@ -961,56 +1034,32 @@ def get_team_insights(token: str = None) -> str:
     user_name = user_info["user_name"]
     
     # Récupérer toutes les mémoires de l'équipe
-    all_memories = []
-    storage = get_storage()
-    
-    if storage:
-        try:
-            all_memories = storage.list_memories(team_id)
-        except Exception as e:
-            print(f"⚠️ Erreur Qdrant, fallback vers mémoire: {e}")
-    
-    # Fallback vers mémoire locale
-    if not all_memories:
-        for memory_id, memory in memories.items():
-            if memory.team_id == team_id:
-                all_memories.append({
-                    "memory_id": memory_id,
-                    "content": memory.content,
-                    "category": getattr(memory, 'category', 'general'),
-                    "tags": memory.tags,
-                    "timestamp": memory.timestamp,
-                    "user_id": getattr(memory, 'user_id', 'unknown'),
-                    "confidence": getattr(memory, 'confidence', 0.5)
-                })
+    all_memories = collect_team_memories(team_id)
     
     # Analyser les patterns
-    categories = {}
-    contributors = {}
-    tags_count = {}
+    categories = Counter()
+    contributors = Counter()
+    tags_count = Counter()
     high_confidence = 0
     
     for memory in all_memories:
         # Compter les catégories
-        category = memory.get('category', 'general')
-        categories[category] = categories.get(category, 0) + 1
+        categories[memory.get('category', 'general')] += 1
         
         # Compter les contributeurs
-        user = memory.get('user_id', 'unknown')
-        contributors[user] = contributors.get(user, 0) + 1
+        contributors[memory.get('user_id', 'unknown')] += 1
         
         # Compter les tags
-        for tag in memory.get('tags', []):
-            tags_count[tag] = tags_count.get(tag, 0) + 1
+        tags_count.update(memory.get('tags', []))
         
         # Compter les mémoires importantes
         if memory.get('confidence', 0) > 0.7:
             high_confidence += 1
     
-    # Top 5 de chaque catégorie
-    top_categories = sorted(categories.items(), key=lambda x: x[1], reverse=True)[:5]
-    top_contributors = sorted(contributors.items(), key=lambda x: x[1], reverse=True)[:5]
-    top_tags = sorted(tags_count.items(), key=lambda x: x[1], reverse=True)[:5]
+    # Top 5 de chaque catégorie (sélection partielle, sans tri complet)
+    top_categories = categories.most_common(5)
+    top_contributors = contributors.most_common(5)
+    top_tags = tags_count.most_common(5)
     
     insights = {
         "team_id": team_id,